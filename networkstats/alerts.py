@@ -0,0 +1,438 @@
+import inspect
+import json
+import logging
+import os
+import queue
+import shlex
+import subprocess
+import threading
+import time
+import urllib.request
+from dataclasses import dataclass, asdict
+from . import histogram
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class Alert:
+    """A state change of one rule for one target."""
+
+    rule: str
+    target: str
+    firing: bool
+    value: float
+    ts: float
+
+    @property
+    def message(self) -> str:
+        state = "FIRING" if self.firing else "RESOLVED"
+        return f"[{state}] {self.rule} on {self.target}: value={self.value:.2f}"
+
+
+class Rule:
+    """Base class for alert rules.
+
+    A rule turns the sample stream of one target into a single value. It fires
+    once the value reaches ``threshold`` and only clears once the value drops
+    below ``clear_threshold`` (hysteresis). ``fire_after`` and
+    ``clear_after`` require that many consecutive breaching/clear samples
+    before the state flips, which suppresses flapping.
+
+    Subclasses implement ``new_state`` and ``measure``; both must be O(1).
+    """
+
+    kind = "rule"
+
+    def __init__(
+        self,
+        threshold: float,
+        name: str | None = None,
+        clear_threshold: float | None = None,
+        targets: list[str] | None = None,
+        fire_after: int = 1,
+        clear_after: int = 1,
+    ):
+        self.name = name or self.kind
+        self.threshold = threshold
+        self.clear_threshold = threshold if clear_threshold is None else clear_threshold
+        if self.clear_threshold > self.threshold:
+            raise ValueError(f"{self.name}: clear_threshold must be <= threshold")
+        self.targets = set(targets) if targets else None
+        self.fire_after = max(1, fire_after)
+        self.clear_after = max(1, clear_after)
+
+    def applies_to(self, target: str) -> bool:
+        return self.targets is None or target in self.targets
+
+    def new_state(self) -> object:
+        raise NotImplementedError
+
+    def measure(self, state, latency_ms: float | None, ok: bool, ts: float) -> float | None:
+        """Fold one sample into ``state`` and return the current value, or None if unknown yet."""
+        raise NotImplementedError
+
+    def breaching(self, value: float, firing: bool) -> bool:
+        if firing:
+            return value >= self.clear_threshold
+        return value >= self.threshold
+
+
+class _Ring:
+    """Fixed-size ring buffer that keeps a running sum of its values."""
+
+    __slots__ = ("buf", "pos", "count", "total")
+
+    def __init__(self, size: int):
+        self.buf = [0] * size
+        self.pos = 0
+        self.count = 0
+        self.total = 0
+
+    def push(self, value: int) -> int | None:
+        """Append ``value`` and return the evicted value, if any."""
+        evicted = None
+        if self.count == len(self.buf):
+            evicted = self.buf[self.pos]
+            self.total -= evicted
+        else:
+            self.count += 1
+        self.buf[self.pos] = value
+        self.total += value
+        self.pos = (self.pos + 1) % len(self.buf)
+        return evicted
+
+    @property
+    def full(self) -> bool:
+        return self.count == len(self.buf)
+
+
+class LossRule(Rule):
+    """Fraction of failed probes over the last ``window`` probes (0.0-1.0)."""
+
+    kind = "loss"
+
+    def __init__(self, window: int = 10, **kwargs):
+        super().__init__(**kwargs)
+        if window < 1:
+            raise ValueError(f"{self.name}: window must be >= 1")
+        self.window = window
+
+    def new_state(self) -> _Ring:
+        return _Ring(self.window)
+
+    def measure(self, state: _Ring, latency_ms, ok, ts):
+        state.push(0 if ok else 1)
+        if not state.full:
+            return None
+        return state.total / self.window
+
+
+class _Histogram:
+    __slots__ = ("ring", "counts")
+
+    def __init__(self, window: int):
+        self.ring = _Ring(window)
+        self.counts = [0] * histogram.BUCKETS
+
+
+class LatencyRule(Rule):
+    """Latency percentile (ms) of successful probes over the last ``window`` of them.
+
+    The value is the upper edge of the histogram bucket holding the percentile,
+    i.e. accurate to within 10%.
+    """
+
+    kind = "latency"
+
+    def __init__(self, window: int = 20, percentile: float = 95.0, **kwargs):
+        super().__init__(**kwargs)
+        if window < 1:
+            raise ValueError(f"{self.name}: window must be >= 1")
+        if not 0 < percentile <= 100:
+            raise ValueError(f"{self.name}: percentile must be in (0, 100]")
+        self.window = window
+        self.percentile = percentile
+
+    def new_state(self) -> _Histogram:
+        return _Histogram(self.window)
+
+    def measure(self, state: _Histogram, latency_ms, ok, ts):
+        # a failed probe measures no latency, so it must not move the debounce either
+        if not ok or latency_ms is None:
+            return None
+        idx = histogram.bucket(latency_ms)
+        evicted = state.ring.push(idx)
+        if evicted is not None:
+            state.counts[evicted] -= 1
+        state.counts[idx] += 1
+        if not state.ring.full:
+            return None
+        return histogram.percentile(state.counts, self.percentile)
+
+
+class DownRule(Rule):
+    """Seconds the target has been failing continuously (0 while it is up)."""
+
+    kind = "down"
+
+    def new_state(self) -> list:
+        return [None]  # timestamp of the first failure in the current outage
+
+    def measure(self, state: list, latency_ms, ok, ts):
+        if ok:
+            state[0] = None
+            return 0.0
+        if state[0] is None:
+            state[0] = ts
+        return ts - state[0]
+
+
+RULE_TYPES = {cls.kind: cls for cls in (LossRule, LatencyRule, DownRule)}
+
+
+class Notifier:
+    """Base class for alert notifiers. ``send`` may block; it never runs on the monitor loop."""
+
+    def send(self, alert: Alert) -> None:
+        raise NotImplementedError
+
+
+class LogNotifier(Notifier):
+    def __init__(self, level: str = "WARNING"):
+        self.level = getattr(logging, level.upper(), logging.WARNING)
+
+    def send(self, alert: Alert) -> None:
+        log.log(self.level, alert.message)
+
+
+class CommandNotifier(Notifier):
+    """Run a shell-style command; alert fields are passed as ``NETWORKSTATS_*`` env vars."""
+
+    def __init__(self, command: str, timeout: float = 10.0):
+        self.argv = shlex.split(command)
+        self.timeout = timeout
+
+    def send(self, alert: Alert) -> None:
+        env = dict(os.environ)
+        for key, value in asdict(alert).items():
+            env[f"NETWORKSTATS_{key.upper()}"] = str(value)
+        env["NETWORKSTATS_MESSAGE"] = alert.message
+        subprocess.run(self.argv, env=env, timeout=self.timeout, check=False)
+
+
+class WebhookNotifier(Notifier):
+    """POST the alert as JSON to ``url``."""
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, alert: Alert) -> None:
+        body = json.dumps({**asdict(alert), "message": alert.message}).encode()
+        req = urllib.request.Request(
+            self.url, data=body, headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(req, timeout=self.timeout):
+            pass
+
+
+NOTIFIER_TYPES = {
+    "log": LogNotifier,
+    "command": CommandNotifier,
+    "webhook": WebhookNotifier,
+}
+
+
+class QueuedNotifier:
+    """Run a notifier on its own thread behind a bounded queue and a token-bucket rate limit.
+
+    ``submit`` never blocks: alerts are dropped (and counted) when the queue is
+    full or, for FIRING alerts only, when the rate limit is exhausted.
+    """
+
+    def __init__(self, notifier: Notifier, queue_size: int = 100, rate_per_min: float = 30.0, burst: int = 5):
+        self.notifier = notifier
+        self.rate = rate_per_min / 60.0
+        self.burst = max(1, burst)
+        self.dropped = 0
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread: threading.Thread | None = None
+
+    def _take_token(self) -> bool:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+        if self._tokens < 1.0:
+            return False
+        self._tokens -= 1.0
+        return True
+
+    def submit(self, alert: Alert) -> bool:
+        # Resolves are never rate limited so consumers don't keep alerts open forever.
+        limited = alert.firing
+        if limited and not self._take_token():
+            self.dropped += 1
+            log.warning(f"Rate limit hit for {type(self.notifier).__name__}, dropping: {alert.message}")
+            return False
+        try:
+            self._queue.put_nowait(alert)
+        except queue.Full:
+            if limited:
+                self._tokens += 1.0
+            self.dropped += 1
+            log.warning(f"Queue full for {type(self.notifier).__name__}, dropping: {alert.message}")
+            return False
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._worker, daemon=True)
+            self._thread.start()
+        return True
+
+    def _worker(self) -> None:
+        while True:
+            alert = self._queue.get()
+            if alert is None:
+                self._queue.task_done()
+                return
+            try:
+                self.notifier.send(alert)
+            except Exception as e:
+                log.error(f"{type(self.notifier).__name__} failed to send alert: {e}")
+            finally:
+                self._queue.task_done()
+
+    def close(self, timeout: float = 1.0) -> None:
+        """Stop the worker after it has drained the queue."""
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+        self._thread = None
+
+
+class _Track:
+    __slots__ = ("state", "firing", "streak")
+
+    def __init__(self, state):
+        self.state = state
+        self.firing = False
+        self.streak = 0  # consecutive samples pointing at the opposite state
+
+
+class AlertEngine:
+    """Evaluate rules incrementally on the monitor's sample stream.
+
+    Cost per sample is O(number of rules): each (rule, target) pair keeps its
+    own fixed-size state and nothing is re-read from storage.
+    """
+
+    def __init__(self, rules: list[Rule], notifiers: list[QueuedNotifier] | None = None):
+        self.rules = rules
+        self.notifiers = notifiers or []
+        self._tracks: dict[tuple[int, str], _Track] = {}
+
+    def observe(self, target: str, latency_ms: float | None, ok: bool, ts: float | None = None) -> list[Alert]:
+        """Feed one probe result and return (and dispatch) any alert state changes."""
+        ts = time.time() if ts is None else ts
+        alerts = []
+        for i, rule in enumerate(self.rules):
+            if not rule.applies_to(target):
+                continue
+            track = self._tracks.get((i, target))
+            if track is None:
+                track = self._tracks[(i, target)] = _Track(rule.new_state())
+            value = rule.measure(track.state, latency_ms, ok, ts)
+            if value is None:
+                continue
+            if rule.breaching(value, track.firing) == track.firing:
+                track.streak = 0
+                continue
+            track.streak += 1
+            if track.streak < (rule.clear_after if track.firing else rule.fire_after):
+                continue
+            track.firing = not track.firing
+            track.streak = 0
+            alerts.append(Alert(rule.name, target, track.firing, value, ts))
+        for alert in alerts:
+            for notifier in self.notifiers:
+                notifier.submit(alert)
+        return alerts
+
+    def firing(self) -> list[tuple[str, str]]:
+        """Return (rule name, target) for every alert currently firing."""
+        return [
+            (self.rules[i].name, target)
+            for (i, target), track in self._tracks.items()
+            if track.firing
+        ]
+
+    def close(self) -> None:
+        for notifier in self.notifiers:
+            notifier.close()
+
+
+def _check_keys(cls: type, spec: dict, what: str) -> None:
+    """Raise ValueError for keys in ``spec`` that no ``__init__`` in ``cls``'s MRO accepts."""
+    accepted = set()
+    for klass in cls.__mro__:
+        init = klass.__dict__.get("__init__")
+        if init is None or klass is object:
+            continue
+        accepted.update(
+            p.name
+            for p in inspect.signature(init).parameters.values()
+            if p.kind not in (p.VAR_POSITIONAL, p.VAR_KEYWORD)
+        )
+    unknown = sorted(set(spec) - accepted - {"self"})
+    if unknown:
+        raise ValueError(f"Unknown option(s) for {what}: {', '.join(unknown)}")
+
+
+def from_config(cfg: dict) -> AlertEngine | None:
+    """Build an AlertEngine from the ``[alerts]`` table of the settings, or None if no rules are set.
+
+    Example::
+
+        [[alerts.rules]]
+        type = "loss"          # loss | latency | down
+        window = 20
+        threshold = 0.5
+        clear_threshold = 0.2
+
+        [[alerts.notifiers]]
+        type = "webhook"       # log | command | webhook
+        url = "https://example.com/hook"
+        rate_per_min = 10
+
+    Raises:
+        ValueError: If a rule or notifier type or option is unknown, or a rule has
+            no threshold.
+    """
+    section = cfg.get("alerts") or {}
+    rules = []
+    for spec in section.get("rules", []):
+        spec = dict(spec)
+        kind = spec.pop("type", None)
+        if kind not in RULE_TYPES:
+            raise ValueError(f"Unknown alert rule type: {kind!r}")
+        if "threshold" not in spec:
+            raise ValueError(f"Alert rule {spec.get('name', kind)!r} has no threshold")
+        _check_keys(RULE_TYPES[kind], spec, f"{kind} rule")
+        rules.append(RULE_TYPES[kind](**spec))
+    if not rules:
+        return None
+    notifiers = []
+    for spec in section.get("notifiers", [{"type": "log"}]):
+        spec = dict(spec)
+        kind = spec.pop("type", None)
+        if kind not in NOTIFIER_TYPES:
+            raise ValueError(f"Unknown notifier type: {kind!r}")
+        queue_opts = {k: spec.pop(k) for k in ("queue_size", "rate_per_min", "burst") if k in spec}
+        _check_keys(NOTIFIER_TYPES[kind], spec, f"{kind} notifier")
+        notifiers.append(QueuedNotifier(NOTIFIER_TYPES[kind](**spec), **queue_opts))
+    return AlertEngine(rules, notifiers)
@@ -0,0 +1,159 @@
+import bisect
+import pathlib
+import threading
+import time
+from array import array
+from typing import Coroutine, Iterable, NamedTuple, Protocol
+import polars as pl
+from . import retention, storage
+
+
+class Sample(NamedTuple):
+    """One probe result, in the column order of the ``pings`` table."""
+
+    ts: int
+    target: str
+    latency_ms: float
+    success: int
+
+
+class StorageBackend(Protocol):
+    """Where the monitor writes samples and where readers query them back."""
+
+    def write_many(self, samples: Iterable[Sample]) -> None:
+        """Persist a batch of samples."""
+
+    def query_range(
+        self, start: int, end: int | None = None, targets: list[str] | None = None
+    ) -> pl.DataFrame:
+        """Return samples with ``start <= ts < end`` in the ``storage.fetch_dataframe`` layout."""
+
+    def background_tasks(self) -> list[Coroutine]:
+        """Coroutines the monitor runs alongside the probe loop, e.g. compaction."""
+
+    def close(self) -> None:
+        """Release any resources held by the backend."""
+
+
+class SQLiteBackend:
+    """Wrapper around the process-wide database managed by :mod:`networkstats.storage`.
+
+    There is only one SQLite database per process: creating a backend with a
+    ``path`` re-points :mod:`networkstats.storage` (and with it the GUI,
+    ``storage.summary`` and retention) at that file, and ``close`` closes the
+    shared connections. Use a single instance.
+    """
+
+    def __init__(self, path: str | None = None, policy: retention.RetentionPolicy | None = None):
+        if path is not None and storage.DB != pathlib.Path(path).expanduser():
+            storage.open_db(path)
+        self.policy = policy or retention.RetentionPolicy()
+
+    def write_many(self, samples: Iterable[Sample]) -> None:
+        storage.record_many(samples)
+
+    def query_range(self, start, end=None, targets=None) -> pl.DataFrame:
+        return storage.fetch_range(start, end, targets)
+
+    def background_tasks(self) -> list[Coroutine]:
+        return [retention.run_periodically(self.policy)]
+
+    def close(self) -> None:
+        storage.close_db()
+
+
+class MemoryBackend:
+    """Keeps samples in process memory as typed columns; nothing is persisted.
+
+    Rows are kept sorted by ``ts``, so range queries are a binary search plus a
+    slice. Monitor writes arrive in time order and are plain appends.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ts = array("q")
+        self._target: list[str] = []
+        self._latency = array("d")
+        self._success = array("b")
+
+    def write_many(self, samples: Iterable[Sample]) -> None:
+        with self._lock:
+            for ts, target, latency_ms, success in samples:
+                if not self._ts or ts >= self._ts[-1]:
+                    self._ts.append(ts)
+                    self._target.append(target)
+                    self._latency.append(latency_ms)
+                    self._success.append(int(success))
+                else:
+                    i = bisect.bisect_right(self._ts, ts)
+                    self._ts.insert(i, ts)
+                    self._target.insert(i, target)
+                    self._latency.insert(i, latency_ms)
+                    self._success.insert(i, int(success))
+
+    def __len__(self) -> int:
+        return len(self._ts)
+
+    def query_range(self, start, end=None, targets=None) -> pl.DataFrame:
+        end = int(time.time()) + 1 if end is None else end
+        with self._lock:
+            lo = bisect.bisect_left(self._ts, start)
+            hi = bisect.bisect_left(self._ts, end)
+            df = pl.DataFrame(
+                {
+                    "ts": self._ts[lo:hi].tolist(),
+                    "target": self._target[lo:hi],
+                    "latency_ms": self._latency[lo:hi].tolist(),
+                    "success": self._success[lo:hi].tolist(),
+                },
+                schema=storage.PING_SCHEMA,
+            )
+        if targets:
+            df = df.filter(pl.col("target").is_in(targets))
+        return storage.with_datetime(df)
+
+    def background_tasks(self) -> list[Coroutine]:
+        return []
+
+    def close(self) -> None:
+        pass
+
+
+class NullBackend:
+    """Discards every sample; only counts them. Useful to benchmark the probe engine alone."""
+
+    def __init__(self):
+        self.written = 0
+
+    def write_many(self, samples: Iterable[Sample]) -> None:
+        self.written += sum(1 for _ in samples)
+
+    def query_range(self, start, end=None, targets=None) -> pl.DataFrame:
+        return storage.with_datetime(pl.DataFrame(schema=storage.PING_SCHEMA))
+
+    def background_tasks(self) -> list[Coroutine]:
+        return []
+
+    def close(self) -> None:
+        pass
+
+
+BACKENDS = {
+    "sqlite": SQLiteBackend,
+    "memory": MemoryBackend,
+    "null": NullBackend,
+}
+
+
+def from_config(cfg: dict) -> StorageBackend:
+    """Create the backend named by ``storage_backend`` in the settings (default ``sqlite``).
+
+    Raises:
+        ValueError: If the backend name is unknown.
+    """
+    name = cfg.get("storage_backend", "sqlite")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown storage backend: {name!r} (choose from {', '.join(BACKENDS)})")
+    if name == "sqlite":
+        return SQLiteBackend(cfg.get("sqlite_path"), retention.RetentionPolicy.from_config(cfg))
+    return BACKENDS[name]()
@@ -3,7 +3,8 @@ from toga.style import Pack
 from toga.style.pack import COLUMN
 import polars as pl
 import plotly.express as px
-from ..storage import fetch_dataframe
+from ..config import load
+from ..storage import summary
 
 
 class StatsWindow(toga.App):
@@ -27,15 +28,18 @@ class StatsWindow(toga.App):
 
     def refresh(self, widget):
         span = self.timeframe.value or 3600
-        df: pl.DataFrame = fetch_dataframe(span)
-        if df.is_empty():
+        backend = load().get("storage_backend", "sqlite")
+        if backend != "sqlite":
+            # summary() reads ping.db; other backends keep no data this window can see
+            self.web.set_content(
+                f"<h3>Stats need the sqlite storage backend (current: {backend}).</h3>",
+                "text/html",
+            )
+            return
+        uptime: pl.DataFrame = summary(window=span)
+        if uptime.is_empty():
             html = "<h3>No data yet…</h3>"
         else:
-            uptime = (
-                df.groupby("target")
-                .agg(pl.col("success").mean() * 100)
-                .rename({"success": "uptime_pct"})
-            )
             fig = px.bar(
                 uptime.to_pandas(),
                 x="target",
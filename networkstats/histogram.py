@@ -0,0 +1,77 @@
+import math
+from array import array
+
+# Latencies are bucketed on a geometric scale, so a percentile is a scan of a
+# fixed number of counters rather than a sort, and histograms of different
+# periods can be merged by adding counts.
+GROWTH = 1.1
+BUCKETS = 100  # 1.1**100 ms ~ 13.8 s; anything slower lands in the last bucket
+
+
+def bucket(latency_ms: float) -> int:
+    if latency_ms <= 1.0:
+        return 0
+    return min(BUCKETS - 1, int(math.log(latency_ms, GROWTH)) + 1)
+
+
+def bucket_upper(idx: int) -> float:
+    return GROWTH**idx
+
+
+def percentile(counts: list[int], pct: float) -> float | None:
+    """Upper edge of the bucket holding the ``pct`` percentile; None if ``counts`` is empty."""
+    total = sum(counts)
+    if not total:
+        return None
+    rank = math.ceil(pct / 100.0 * total)
+    seen = 0
+    for idx, n in enumerate(counts):
+        seen += n
+        if seen >= rank:
+            return bucket_upper(idx)
+    return bucket_upper(BUCKETS - 1)
+
+
+def encode(counts: list[int]) -> bytes | None:
+    """Pack the non-empty buckets as ``(index, count)`` uint32 pairs; None if all are empty."""
+    pairs = array("I")
+    for idx, n in enumerate(counts):
+        if n:
+            pairs.extend((idx, n))
+    return pairs.tobytes() if pairs else None
+
+
+def add(counts: list[int], blob: bytes | None, successes: int = 0, latency_sum: float | None = None) -> None:
+    """Add an encoded histogram to ``counts``.
+
+    Rows rolled up before histograms were stored have no ``blob``; their
+    ``successes`` are counted at their mean latency instead.
+    """
+    if blob is not None:
+        pairs = array("I")
+        pairs.frombytes(blob)
+        for i in range(0, len(pairs), 2):
+            counts[pairs[i]] += pairs[i + 1]
+    elif successes and latency_sum is not None:
+        counts[bucket(latency_sum / successes)] += successes
+
+
+class LatencyHist:
+    """SQLite aggregate ``latency_hist(latency_ms)``: the encoded histogram of non-NULL values."""
+
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+
+    def step(self, latency_ms):
+        if latency_ms is not None:
+            self.counts[bucket(latency_ms)] += 1
+
+    def finalize(self):
+        return encode(self.counts)
+
+
+class MergeHist(LatencyHist):
+    """SQLite aggregate ``latency_hist_merge(latency_hist, successes, latency_sum)``."""
+
+    def step(self, blob, successes, latency_sum):
+        add(self.counts, blob, successes, latency_sum)
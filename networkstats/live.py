@@ -0,0 +1,137 @@
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+SPARK_FAIL = "✕"
+
+
+@dataclass(frozen=True)
+class TargetStatus:
+    """Latest probe result for one target plus its recent latencies (oldest first, None = failed)."""
+
+    target: str
+    latency_ms: float | None
+    ok: bool
+    ts: float
+    history: tuple[float | None, ...]
+
+
+class _Target:
+    __slots__ = ("latency_ms", "ok", "ts", "history")
+
+    def __init__(self, history: int):
+        self.latency_ms = None
+        self.ok = False
+        self.ts = 0.0
+        self.history: deque = deque(maxlen=history)
+
+
+class Subscription:
+    """One consumer's view of a StatusChannel.
+
+    Publishes only mark targets dirty; ``poll`` hands out the coalesced
+    changes at most ``max_hz`` times per second.
+    """
+
+    def __init__(self, channel: "StatusChannel", max_hz: float):
+        self._channel = channel
+        self.min_interval = 1.0 / max_hz if max_hz > 0 else 0.0
+        self._dirty: set[str] = set()
+        self._last_poll = float("-inf")
+
+    def poll(self, now: float | None = None) -> dict[str, TargetStatus]:
+        """Return targets changed since the last delivery, or {} if none or too soon."""
+        now = time.monotonic() if now is None else now
+        if now - self._last_poll < self.min_interval:
+            return {}
+        with self._channel._lock:
+            if not self._dirty:
+                return {}
+            dirty, self._dirty = self._dirty, set()
+            changed = {t: self._channel._status(t) for t in dirty}
+        self._last_poll = now
+        return changed
+
+    def close(self) -> None:
+        self._channel.unsubscribe(self)
+
+
+class StatusChannel:
+    """Thread-safe publish/subscribe channel from the monitor loop to UI consumers.
+
+    ``publish`` is O(subscribers) and never blocks on a consumer, so it is safe
+    to call from the monitor for every sample.
+    """
+
+    def __init__(self, history: int = 30):
+        self.history = history
+        self._lock = threading.Lock()
+        self._targets: dict[str, _Target] = {}
+        self._subscribers: list[Subscription] = []
+
+    def publish(self, target: str, latency_ms: float | None, ok: bool, ts: float | None = None) -> None:
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            state = self._targets.get(target)
+            if state is None:
+                state = self._targets[target] = _Target(self.history)
+            state.latency_ms = latency_ms if ok else None
+            state.ok = ok
+            state.ts = ts
+            state.history.append(state.latency_ms)
+            for sub in self._subscribers:
+                sub._dirty.add(target)
+
+    def subscribe(self, max_hz: float = 2.0) -> Subscription:
+        """Create a subscription; its first poll returns every known target."""
+        sub = Subscription(self, max_hz)
+        with self._lock:
+            sub._dirty.update(self._targets)
+            self._subscribers.append(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            if sub in self._subscribers:
+                self._subscribers.remove(sub)
+
+    def latest(self) -> dict[str, TargetStatus]:
+        with self._lock:
+            return {t: self._status(t) for t in self._targets}
+
+    def _status(self, target: str) -> TargetStatus:
+        s = self._targets[target]
+        return TargetStatus(target, s.latency_ms, s.ok, s.ts, tuple(s.history))
+
+
+def sparkline(values: tuple[float | None, ...]) -> str:
+    """Render latencies as block characters scaled to their own range; failures show as ✕."""
+    ok = [v for v in values if v is not None]
+    if not ok:
+        return SPARK_FAIL * len(values)
+    lo, hi = min(ok), max(ok)
+    span = (hi - lo) or 1.0
+    top = len(SPARK_CHARS) - 1
+    return "".join(
+        SPARK_FAIL if v is None else SPARK_CHARS[round((v - lo) / span * top)]
+        for v in values
+    )
+
+
+def summarize(statuses: dict[str, TargetStatus]) -> str:
+    """One-line status for the menu bar title."""
+    if not statuses:
+        return "Net📶"
+    down = sum(1 for s in statuses.values() if not s.ok)
+    if down:
+        return f"🔴 {down}/{len(statuses)} down"
+    latencies = sorted(s.latency_ms for s in statuses.values())
+    return f"🟢 {latencies[len(latencies) // 2]:.0f} ms"
+
+
+def format_item(status: TargetStatus) -> str:
+    """Menu line for a single target."""
+    latency = f"{status.latency_ms:.0f} ms" if status.ok else "down"
+    return f"{status.target}  {latency}  {sparkline(status.history)}"
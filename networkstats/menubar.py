@@ -2,18 +2,22 @@ import rumps
 import asyncio
 import threading
 from .monitor import monitor
+from .live import StatusChannel, summarize, format_item
 from .gui.window import StatsWindow
 import logging
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# Upper bound on how often the menu is redrawn, however fast results arrive.
+UI_REFRESH_HZ = 2.0
 
-def start_asyncio_loop(loop):
+
+def start_asyncio_loop(loop, channel=None):
     logger.debug("Starting asyncio loop thread")
     asyncio.set_event_loop(loop)
     try:
-        loop.run_until_complete(monitor())
+        loop.run_until_complete(monitor(channel=channel))
     except Exception as e:
         import traceback
         logger.error("Exception in monitor thread:\n%s", traceback.format_exc())
@@ -21,8 +25,9 @@ def start_asyncio_loop(loop):
 
 def run_status_bar():
     logger.debug("Entered run_status_bar()")
+    channel = StatusChannel()
     loop = asyncio.new_event_loop()
-    threading.Thread(target=start_asyncio_loop, args=(loop,), daemon=True).start()
+    threading.Thread(target=start_asyncio_loop, args=(loop, channel), daemon=True).start()
     logger.debug("Asyncio monitor thread started")
 
     class MenuApp(rumps.App):
@@ -30,6 +35,34 @@ def run_status_bar():
             logger.debug("Initializing MenuApp")
             super().__init__("Net📶", icon="🌐", quit_button=None)
             self.menu = ["Open Stats", None, "Quit"]
+            self.statuses = {}
+            self.items = {}
+            # menu key of the last target line; rumps keys items by their first title
+            self.last_key = None
+            self.subscription = channel.subscribe(max_hz=UI_REFRESH_HZ)
+            # rumps timers fire on the main thread, so the menu is only touched there
+            self.timer = rumps.Timer(self.refresh, 1.0 / UI_REFRESH_HZ)
+            self.timer.start()
+
+        def refresh(self, _):
+            changed = self.subscription.poll()
+            if not changed:
+                return
+            self.statuses.update(changed)
+            for target, status in changed.items():
+                item = self.items.get(target)
+                if item is None:
+                    item = self.items[target] = rumps.MenuItem(format_item(status))
+                    if self.last_key is None:
+                        # first target: the lines go on top, split from "Open Stats"
+                        self.menu.insert_before("Open Stats", item)
+                        self.menu.insert_before("Open Stats", rumps.separator)
+                    else:
+                        self.menu.insert_after(self.last_key, item)
+                    self.last_key = item.title
+                else:
+                    item.title = format_item(status)
+            self.title = summarize(self.statuses)
 
         @rumps.clicked("Open Stats")
         def open_stats(self, _):
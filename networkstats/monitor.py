@@ -5,7 +5,8 @@ import statistics
 import logging
 import time
 from concurrent.futures import ThreadPoolExecutor
-from .storage import record
+from . import alerts, backends
+from .live import StatusChannel
 from .config import load
 
 log = logging.getLogger(__name__)
@@ -93,7 +94,14 @@ async def _ping_once(
         return None
 
 
-async def monitor(verbose: bool = False, quiet: bool = False, extra_ping_args: str = "", once: bool = False):
+async def monitor(
+    verbose: bool = False,
+    quiet: bool = False,
+    extra_ping_args: str = "",
+    once: bool = False,
+    channel: StatusChannel | None = None,
+    backend: backends.StorageBackend | None = None,
+):
     """Main async ping loop for all targets.
 
     Args:
@@ -101,12 +109,23 @@ async def monitor(verbose: bool = False, quiet: bool = False, extra_ping_args: s
         quiet: Pass -q to ping for quiet output.
         extra_ping_args: Extra arguments to pass to ping.
         once: If True, run only one iteration and exit.
+        channel: If given, every result is also published here for live UIs.
+        backend: Where results are stored; defaults to ``storage_backend`` from the
+            settings. A backend passed in is left open for the caller to close.
     """
     targets = cfg["targets"]
     interval = cfg["interval_sec"]
     log.info(f"Starting monitor loop for targets: {targets}, interval: {interval}s")
     log.info(f"Using executor with {executor._max_workers} workers")
-    log.info(f"Connected to database at {cfg['sqlite_path']}")
+    # Build the alert engine first: a bad [alerts] table must not leave a backend open.
+    engine = alerts.from_config(cfg)
+    if engine:
+        log.info(f"Alerting enabled with {len(engine.rules)} rules")
+    owns_backend = backend is None
+    if owns_backend:
+        backend = backends.from_config(cfg)
+    log.info(f"Storing results with {type(backend).__name__}")
+    maintenance = [asyncio.create_task(task) for task in backend.background_tasks()]
     try:
         while True:
             log.debug("Starting new monitor iteration")
@@ -115,14 +134,21 @@ async def monitor(verbose: bool = False, quiet: bool = False, extra_ping_args: s
             # Wait for all tasks to complete
             results = await asyncio.gather(*tasks, return_exceptions=True)
             # Process results
+            ts = int(time.time())
+            batch = []
             for target, result in zip(targets, results):
                 if isinstance(result, Exception):
                     log.error(f"Error pinging {target}: {result}")
-                    record(target, 0.0, False)
+                    latency = None
                 else:
                     latency = result
                     log.debug(f"Result for {target}: latency={latency} ms, success={latency is not None}")
-                    record(target, latency or 0.0, latency is not None)
+                batch.append(backends.Sample(ts, target, latency or 0.0, int(latency is not None)))
+                if engine:
+                    engine.observe(target, latency, latency is not None)
+                if channel:
+                    channel.publish(target, latency, latency is not None)
+            backend.write_many(batch)
             if once:
                 break
             await asyncio.sleep(interval)
@@ -130,3 +156,12 @@ async def monitor(verbose: bool = False, quiet: bool = False, extra_ping_args: s
         log.info("Monitor cancelled, shutting down cleanly.")
         # Optionally: clean up or flush data here
         raise
+    finally:
+        for task in maintenance:
+            task.cancel()
+        # let a compaction pass running in a worker thread finish before closing
+        await asyncio.gather(*maintenance, return_exceptions=True)
+        if owns_backend:
+            backend.close()
+        if engine:
+            engine.close()
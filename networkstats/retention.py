@@ -0,0 +1,226 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from . import storage
+
+log = logging.getLogger(__name__)
+
+DAY = 86400
+
+# (name, source table, bucket seconds, rollup statement). The 1m rollup is
+# built from raw pings and the 1h rollup from the 1m rollup. The latency_hist*
+# aggregates are registered on the writer connection by storage.
+ROLLUPS = [
+    (
+        "1m",
+        "pings",
+        60,
+        """INSERT OR REPLACE INTO pings_1m
+        SELECT ts - ts % 60, target, COUNT(*), SUM(success),
+               SUM(CASE WHEN success THEN latency_ms END),
+               MIN(CASE WHEN success THEN latency_ms END),
+               MAX(CASE WHEN success THEN latency_ms END),
+               latency_hist(CASE WHEN success THEN latency_ms END)
+        FROM pings WHERE ts >= ? AND ts < ? GROUP BY 1, 2""",
+    ),
+    (
+        "1h",
+        "pings_1m",
+        3600,
+        """INSERT OR REPLACE INTO pings_1h
+        SELECT ts - ts % 3600, target, SUM(probes), SUM(successes),
+               SUM(latency_sum), MIN(latency_min), MAX(latency_max),
+               latency_hist_merge(latency_hist, successes, latency_sum)
+        FROM pings_1m WHERE ts >= ? AND ts < ? GROUP BY 1, 2""",
+    ),
+]
+
+# Rollups are written at most this much source time per transaction so a
+# backlog never holds the writer lock for long.
+ROLLUP_SPAN_SEC = 6 * 3600
+VACUUM_PAGES_PER_STEP = 256
+
+GET_WATERMARK = "SELECT rolled_until FROM rollup_state WHERE resolution=?"
+SET_WATERMARK = "INSERT OR REPLACE INTO rollup_state VALUES (?, ?)"
+
+
+@dataclass
+class RetentionPolicy:
+    """How long each resolution is kept, in days (0 keeps it forever).
+
+    Read from the ``[retention]`` table of the settings, e.g.::
+
+        [retention]
+        raw_days = 7
+        minute_days = 90
+        hour_days = 0
+    """
+
+    raw_days: float = 7
+    minute_days: float = 90
+    hour_days: float = 0
+    interval_sec: float = 900
+    chunk_rows: int = 5000
+    max_seconds: float = 5.0
+    # Only buckets older than this are rolled up. The monitor timestamps a batch
+    # before it commits, so rows can land a little behind "now".
+    rollup_grace_sec: float = 120
+
+    @classmethod
+    def from_config(cls, cfg: dict) -> "RetentionPolicy":
+        section = dict(cfg.get("retention") or {})
+        # at least one probe interval plus the ping timeout
+        section.setdefault(
+            "rollup_grace_sec", max(cls.rollup_grace_sec, 2 * cfg.get("interval_sec", 30))
+        )
+        return cls(**section)
+
+
+@dataclass
+class CompactionReport:
+    rolled_up: dict[str, int] = field(default_factory=dict)
+    deleted: dict[str, int] = field(default_factory=dict)
+    bytes_reclaimed: int = 0
+    seconds: float = 0.0
+    complete: bool = True
+
+    def __str__(self) -> str:
+        status = "" if self.complete else " (time budget hit, resuming next pass)"
+        return (
+            f"rolled up {self.rolled_up}, deleted {self.deleted}, "
+            f"reclaimed {self.bytes_reclaimed / 1024:.0f} KiB in {self.seconds:.2f}s{status}"
+        )
+
+
+def _file_bytes() -> int:
+    with storage.reader() as c:
+        pages = c.execute("PRAGMA page_count").fetchone()[0]
+        size = c.execute("PRAGMA page_size").fetchone()[0]
+    return pages * size
+
+
+def _watermark(name: str, source: str, bucket: int) -> int | None:
+    with storage.reader() as c:
+        row = c.execute(GET_WATERMARK, (name,)).fetchone()
+        if row:
+            return row[0]
+        first = c.execute(f"SELECT MIN(ts) FROM {source}").fetchone()[0]
+    return None if first is None else first - first % bucket
+
+
+def _roll_up(name: str, source: str, bucket: int, sql: str, upto: int, deadline: float) -> tuple[int, bool]:
+    """Roll complete buckets of ``source`` before ``upto`` forward from the watermark.
+
+    Returns:
+        (rows written, whether the rollup caught up before the deadline).
+    """
+    until = upto - upto % bucket
+    start = _watermark(name, source, bucket)
+    if start is None:
+        return 0, True
+    written = 0
+    while start < until:
+        if time.monotonic() > deadline:
+            return written, False
+        end = min(until, start + ROLLUP_SPAN_SEC)
+        with storage.writer() as c:
+            written += c.execute(sql, (start, end)).rowcount
+            c.execute(SET_WATERMARK, (name, end))
+        start = end
+    return written, True
+
+
+def _expire(table: str, cutoff: int, chunk_rows: int, deadline: float) -> tuple[int, bool]:
+    """Delete rows older than ``cutoff`` a chunk at a time.
+
+    Returns:
+        (rows deleted, whether all expired rows are gone).
+    """
+    sql = f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} WHERE ts < ? LIMIT ?)"
+    deleted = 0
+    while True:
+        with storage.writer() as c:
+            n = c.execute(sql, (cutoff, chunk_rows)).rowcount
+        deleted += n
+        if n < chunk_rows:
+            return deleted, True
+        if time.monotonic() > deadline:
+            return deleted, False
+
+
+def _incremental_vacuum(deadline: float) -> bool:
+    with storage.writer() as c:
+        if c.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            log.info(
+                "auto_vacuum is not INCREMENTAL on this database; freed pages will be "
+                "reused but the file only shrinks after a one-off VACUUM"
+            )
+            return True
+    while True:
+        with storage.writer() as c:
+            if c.execute("PRAGMA freelist_count").fetchone()[0] == 0:
+                return True
+            c.execute(f"PRAGMA incremental_vacuum({VACUUM_PAGES_PER_STEP})").fetchall()
+        if time.monotonic() > deadline:
+            return False
+
+
+def compact(policy: RetentionPolicy, now: int | None = None) -> CompactionReport:
+    """Run one rollup + expiry + incremental vacuum pass within ``policy.max_seconds``.
+
+    Rows are only expired once they have been rolled into the next resolution,
+    so a stalled rollup never loses data.
+    """
+    now = int(time.time()) if now is None else now
+    started = time.monotonic()
+    deadline = started + policy.max_seconds
+    report = CompactionReport()
+    size_before = _file_bytes()
+
+    watermarks = {}
+    for name, source, bucket, sql in ROLLUPS:
+        report.rolled_up[name], done = _roll_up(
+            name, source, bucket, sql, now - int(policy.rollup_grace_sec), deadline
+        )
+        report.complete &= done
+        watermarks[name] = _watermark(name, source, bucket) or 0
+
+    for table, days, rolled_until in (
+        ("pings", policy.raw_days, watermarks["1m"]),
+        ("pings_1m", policy.minute_days, watermarks["1h"]),
+        ("pings_1h", policy.hour_days, None),
+    ):
+        if days <= 0:
+            continue
+        cutoff = now - int(days * DAY)
+        if rolled_until is not None:
+            cutoff = min(cutoff, rolled_until)
+        report.deleted[table], done = _expire(table, cutoff, policy.chunk_rows, deadline)
+        report.complete &= done
+
+    if sum(report.deleted.values()):
+        report.complete &= _incremental_vacuum(deadline)
+    report.bytes_reclaimed = max(0, size_before - _file_bytes())
+    report.seconds = time.monotonic() - started
+    return report
+
+
+async def run_periodically(policy: RetentionPolicy) -> None:
+    """Compact every ``policy.interval_sec`` seconds off the event loop until cancelled.
+
+    Cancellation waits for a pass already running in the executor (at most
+    ``policy.max_seconds``), so the database can be closed safely afterwards.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(policy.interval_sec)
+        running = loop.run_in_executor(None, compact, policy)
+        try:
+            report = await asyncio.shield(running)
+            log.info(f"Compaction: {report}")
+        except asyncio.CancelledError:
+            await asyncio.wait([running])
+            raise
+        except Exception as e:
+            log.error(f"Compaction failed: {e}")
@@ -1,12 +1,20 @@
+import contextlib
+from collections import OrderedDict
+import queue
 import sqlite3
+import threading
 import time
 import pathlib
 import polars as pl
+from . import histogram
 from .config import load
 
-cfg = load()
-DB = pathlib.Path(cfg["sqlite_path"]).expanduser()
-DB.parent.mkdir(parents=True, exist_ok=True)
+# The database is opened on first use (from ``sqlite_path`` in the settings)
+# or explicitly via open_db(), so importing this module touches no files.
+DB: pathlib.Path | None = None
+
+# Readers beyond this many wait for a free connection instead of opening more.
+READ_POOL_SIZE = 4
 
 DDL = """
 CREATE TABLE IF NOT EXISTS pings (
@@ -17,33 +25,436 @@ CREATE TABLE IF NOT EXISTS pings (
   PRIMARY KEY (ts, target)
 );
 CREATE INDEX IF NOT EXISTS idx_target_ts ON pings(target, ts DESC);
+CREATE TABLE IF NOT EXISTS pings_1m (
+  ts INTEGER NOT NULL,
+  target TEXT NOT NULL,
+  probes INTEGER NOT NULL,
+  successes INTEGER NOT NULL,
+  latency_sum REAL,
+  latency_min REAL,
+  latency_max REAL,
+  latency_hist BLOB,
+  PRIMARY KEY (ts, target)
+);
+CREATE TABLE IF NOT EXISTS pings_1h (
+  ts INTEGER NOT NULL,
+  target TEXT NOT NULL,
+  probes INTEGER NOT NULL,
+  successes INTEGER NOT NULL,
+  latency_sum REAL,
+  latency_min REAL,
+  latency_max REAL,
+  latency_hist BLOB,
+  PRIMARY KEY (ts, target)
+);
+CREATE TABLE IF NOT EXISTS rollup_state (
+  resolution TEXT PRIMARY KEY,
+  rolled_until INTEGER NOT NULL
+);
 """
 
+# Statements are kept as constants so sqlite3's per-connection statement cache
+# reuses the prepared statement on every call.
+INSERT_PING = "INSERT OR REPLACE INTO pings VALUES (?,?,?,?)"
+SELECT_RANGE = "SELECT ts, target, latency_ms, success FROM pings WHERE ts>=? AND ts<?"
+
+PING_SCHEMA = {
+    "ts": pl.Int64,
+    "target": pl.Utf8,
+    "latency_ms": pl.Float64,
+    "success": pl.Int64,
+}
+
 
-def _conn():
-    c = sqlite3.connect(DB, check_same_thread=False)
+def _conn(path: pathlib.Path) -> sqlite3.Connection:
+    """Open the writer connection, switching the database to WAL mode."""
+    c = sqlite3.connect(path, check_same_thread=False)
+    # Only takes effect on a new file; lets retention reclaim space without a full VACUUM.
+    c.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    # WAL lets readers on other connections run while the writer commits.
+    c.execute("PRAGMA journal_mode=WAL")
+    c.execute("PRAGMA synchronous=NORMAL")
     c.executescript(DDL)
+    for table in ("pings_1m", "pings_1h"):
+        # rollup tables created before latency histograms were kept
+        if "latency_hist" not in {row[1] for row in c.execute(f"PRAGMA table_info({table})")}:
+            c.execute(f"ALTER TABLE {table} ADD COLUMN latency_hist BLOB")
+    # used by the rollup statements in retention
+    c.create_aggregate("latency_hist", 1, histogram.LatencyHist)
+    c.create_aggregate("latency_hist_merge", 3, histogram.MergeHist)
+    return c
+
+
+def _read_conn(path: pathlib.Path) -> sqlite3.Connection:
+    c = sqlite3.connect(
+        f"{path.resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False
+    )
+    c.execute("PRAGMA query_only=ON")
     return c
 
 
-CONN = _conn()
+class ReadPool:
+    """A bounded pool of read-only connections to the database.
+
+    Connections are opened lazily up to ``size``; callers beyond that block
+    until one is returned. A connection is only ever used by one thread at a
+    time.
+    """
+
+    def __init__(self, path: pathlib.Path, size: int = READ_POOL_SIZE):
+        self.path = path
+        self.size = size
+        self.closed = False
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self) -> sqlite3.Connection | None:
+        """Take an idle connection or open one; None once the pool is closed."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self.closed:
+                return None
+            if self._opened < self.size:
+                self._opened += 1
+                try:
+                    return _read_conn(self.path)
+                except Exception:
+                    self._opened -= 1
+                    raise
+        while not self.closed:
+            try:
+                return self._idle.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return None
+
+    def _release(self, c: sqlite3.Connection) -> None:
+        with self._lock:
+            if self.closed:
+                # checked out while the pool was closed: nobody else will close it
+                c.close()
+                return
+        self._idle.put(c)
+
+    @contextlib.contextmanager
+    def connection(self):
+        """Borrow a read-only connection for the duration of the ``with`` block.
+
+        Raises:
+            sqlite3.ProgrammingError: If the pool has been closed.
+        """
+        c = self._acquire()
+        if c is None:
+            raise sqlite3.ProgrammingError("Read pool is closed")
+        try:
+            yield c
+        finally:
+            self._release(c)
+
+    def close(self) -> None:
+        """Close idle connections now and borrowed ones as they are returned."""
+        with self._lock:
+            self.closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_write_lock = threading.Lock()
+# Guards swapping CONN/READERS; always taken after _write_lock, never before.
+_state_lock = threading.Lock()
+CONN: sqlite3.Connection | None = None
+READERS: ReadPool | None = None
+# Bumped on every committed write; cached summaries from an older value are stale.
+WRITE_SEQ = 0
+
+
+def _open_locked(path: pathlib.Path | str) -> None:
+    """(Re)open the database at ``path``; the caller holds ``_write_lock``."""
+    global DB, CONN, READERS, WRITE_SEQ
+    old_conn, old_readers = CONN, READERS
+    new_db = pathlib.Path(path).expanduser()
+    new_db.parent.mkdir(parents=True, exist_ok=True)
+    new_conn = _conn(new_db)
+    with _state_lock:
+        WRITE_SEQ += 1
+        DB, CONN, READERS = new_db, new_conn, ReadPool(new_db)
+    if old_conn is not None:
+        old_conn.close()
+        old_readers.close()
+
+
+def open_db(path: pathlib.Path | str) -> None:
+    """Point the writer connection and the read pool at the database at ``path``."""
+    with _write_lock:
+        _open_locked(path)
+
+
+def close_db() -> None:
+    """Close the writer connection and the read pool; the next use reopens the same file."""
+    global CONN, READERS, WRITE_SEQ
+    with _write_lock:
+        with _state_lock:
+            WRITE_SEQ += 1
+            old_conn, old_readers = CONN, READERS
+            CONN = READERS = None
+        if old_conn is not None:
+            old_conn.close()
+            old_readers.close()
+
+
+@contextlib.contextmanager
+def reader():
+    """Borrow a read-only connection from the pool, opening the database if needed."""
+    while True:
+        with _state_lock:
+            pool = READERS
+        if pool is None:
+            with _write_lock:
+                if CONN is None:
+                    _open_locked(DB or load()["sqlite_path"])
+            continue
+        c = pool._acquire()
+        if c is None:
+            continue  # the pool was swapped out under us; take the new one
+        try:
+            yield c
+        finally:
+            pool._release(c)
+        return
+
+
+@contextlib.contextmanager
+def writer():
+    """Hold the writer connection for one transaction, committing on success.
+
+    Keep the block short: ingestion waits on the same lock.
+    """
+    global WRITE_SEQ
+    with _write_lock:
+        if CONN is None:
+            _open_locked(DB or load()["sqlite_path"])
+        conn = CONN
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            WRITE_SEQ += 1
 
 
 def record(target: str, latency_ms: float, ok: bool) -> None:
     """Record a ping result in the database."""
-    CONN.execute(
-        "INSERT OR REPLACE INTO pings VALUES (?,?,?,?)",
-        (int(time.time()), target, latency_ms, int(ok)),
-    )
-    CONN.commit()
+    with writer() as c:
+        c.execute(INSERT_PING, (int(time.time()), target, latency_ms, int(ok)))
+
+
+def record_many(rows) -> None:
+    """Record many ``(ts, target, latency_ms, success)`` rows in one transaction."""
+    with writer() as c:
+        c.executemany(INSERT_PING, rows)
+
+
+def with_datetime(df: pl.DataFrame) -> pl.DataFrame:
+    return df.with_columns(pl.col("ts").cast(pl.Datetime).alias("datetime"))
+
+
+def fetch_range(start: int, end: int | None = None, targets: list[str] | None = None) -> pl.DataFrame:
+    """Return a Polars DF of pings with ``start <= ts < end``, optionally only for ``targets``."""
+    end = int(time.time()) + 1 if end is None else end
+    sql, params = SELECT_RANGE, [start, end]
+    if targets:
+        sql += f" AND target IN ({','.join('?' * len(targets))})"
+        params += targets
+    with reader() as c:
+        rows = c.execute(sql, params).fetchall()
+    return with_datetime(pl.DataFrame(rows, schema=PING_SCHEMA, orient="row"))
 
 
 def fetch_dataframe(since_sec: int) -> pl.DataFrame:
     """Return a Polars DF of pings within the last `since_sec` seconds."""
-    t0 = int(time.time()) - since_sec
-    query = f"SELECT ts, target, latency_ms, success FROM pings WHERE ts>={t0}"
-    df = pl.read_database(
-        query,
-        connection=CONN,
+    return fetch_range(int(time.time()) - since_sec)
+
+
+# Raw rows not yet rolled up, then the 1m rollup, then the 1h rollup for the
+# part of the window the 1m rollup no longer covers. Each branch gets its own
+# [start, end) range so no probe is counted twice.
+SELECT_SUMMARY_ROWS = """
+SELECT ts, target, 1, success, CASE WHEN success THEN latency_ms END,
+       CASE WHEN success THEN latency_ms END, CASE WHEN success THEN latency_ms END, NULL
+FROM pings WHERE ts>=? AND ts<?
+UNION ALL
+SELECT ts, target, probes, successes, latency_sum, latency_min, latency_max, latency_hist
+FROM pings_1m WHERE ts>=? AND ts<?
+UNION ALL
+SELECT ts, target, probes, successes, latency_sum, latency_min, latency_max, latency_hist
+FROM pings_1h WHERE ts>=? AND ts<?
+"""
+
+SUMMARY_ROW_SCHEMA = {
+    "ts": pl.Int64,
+    "target": pl.Utf8,
+    "probes": pl.Int64,
+    "successes": pl.Int64,
+    "latency_sum": pl.Float64,
+    "latency_min": pl.Float64,
+    "latency_max": pl.Float64,
+    "latency_hist": pl.Binary,
+}
+
+SUMMARY_TTL_SEC = 30.0
+SUMMARY_CACHE_SIZE = 64
+
+_summary_cache: OrderedDict = OrderedDict()
+_summary_lock = threading.Lock()
+
+
+def _summary_rows(start: int, end: int, targets: list[str] | None) -> pl.DataFrame:
+    with reader() as c:
+        rolled = dict(c.execute("SELECT resolution, rolled_until FROM rollup_state").fetchall())
+        first_1m = c.execute("SELECT MIN(ts) FROM pings_1m").fetchone()[0]
+        rolled_1m, rolled_1h = rolled.get("1m"), rolled.get("1h")
+        if rolled_1m is None:
+            ranges = [(start, end), (0, 0), (0, 0)]
+        else:
+            first_1m = rolled_1m if first_1m is None else first_1m
+            # Hand over from 1h to 1m rows on an hour boundary: the hour holding
+            # the oldest 1m row is also in pings_1h once the 1h rollup passed it.
+            split = first_1m
+            if rolled_1h is not None:
+                split = min(first_1m + (-first_1m) % 3600, rolled_1h)
+            ranges = [
+                (max(start, rolled_1m), end),
+                (max(start, split), min(end, rolled_1m)),
+                (start, min(end, split)),
+            ]
+        sql = SELECT_SUMMARY_ROWS
+        params = [bound for r in ranges for bound in r]
+        if targets:
+            sql = f"SELECT * FROM ({sql}) WHERE target IN ({','.join('?' * len(targets))})"
+            params += targets
+        rows = c.execute(sql, params).fetchall()
+    return pl.DataFrame(rows, schema=SUMMARY_ROW_SCHEMA, orient="row")
+
+
+def _percentiles(rows: pl.DataFrame) -> pl.DataFrame:
+    """p50/p95/p99 latency per (bucket, target) from the merged histograms of ``rows``."""
+    hists: dict[tuple[int, str], list[int]] = {}
+    for key, successes, latency_sum, blob in zip(
+        rows.select("bucket", "target").iter_rows(),
+        rows["successes"],
+        rows["latency_sum"],
+        rows["latency_hist"],
+    ):
+        counts = hists.setdefault(key, [0] * histogram.BUCKETS)
+        # raw rows carry no histogram: one success at its own latency
+        histogram.add(counts, blob, successes, latency_sum)
+    return pl.DataFrame(
+        [
+            (b, t, *(histogram.percentile(counts, p) for p in (50, 95, 99)))
+            for (b, t), counts in hists.items()
+        ],
+        schema={
+            "bucket": pl.Int64,
+            "target": pl.Utf8,
+            "latency_p50_ms": pl.Float64,
+            "latency_p95_ms": pl.Float64,
+            "latency_p99_ms": pl.Float64,
+        },
+        orient="row",
     )
-    return df.with_columns(pl.col("ts").cast(pl.Datetime).alias("datetime"))
+
+
+def summary(
+    targets: list[str] | None = None,
+    window: int = 3600,
+    buckets: int = 1,
+    now: int | None = None,
+) -> pl.DataFrame:
+    """Summarise uptime, loss and latency per target over the last ``window`` seconds.
+
+    Reads the SQLite database only; it does not see the memory or null backends.
+
+    Rolled-up minutes and hours are read from the rollup tables and only the
+    not-yet-rolled tail from raw pings. Latency percentiles come from the merged
+    latency histograms of those rows plus the raw tail, so they are the upper
+    edge of a histogram bucket (within 10%), kept within the observed min/max.
+
+    Results are cached for up to SUMMARY_TTL_SEC and dropped as soon as any
+    write is committed, so repeated calls between probes are served from memory.
+
+    Args:
+        targets: Targets to include; all when None.
+        window: Length of the window in seconds, ending now.
+        buckets: Number of equal time buckets to split the window into.
+        now: End of the window; defaults to the current time. Passing it bypasses the cache.
+
+    Returns:
+        One row per (bucket, target) with ``bucket`` (start ts), ``target``,
+        ``probes``, ``uptime_pct``, ``loss_pct``, ``latency_avg_ms``,
+        ``latency_p50_ms``, ``latency_p95_ms`` and ``latency_p99_ms``.
+    """
+    key = (tuple(sorted(targets)) if targets else None, window, buckets)
+    cached = now is None
+    if cached:
+        with _summary_lock:
+            hit = _summary_cache.get(key)
+            if hit and hit[0] == WRITE_SEQ and time.monotonic() - hit[1] < SUMMARY_TTL_SEC:
+                _summary_cache.move_to_end(key)
+                return hit[2]
+    seq = WRITE_SEQ
+    end = int(time.time()) + 1 if now is None else now
+    start = end - window
+    width = max(1, window // max(1, buckets))
+    rows = _summary_rows(start, end, targets).with_columns(
+        bucket=start + ((pl.col("ts") - start) // width).clip(0, buckets - 1) * width
+    )
+    observed = (pl.col("latency_min"), pl.col("latency_max"))
+    df = (
+        rows.group_by("bucket", "target")
+        .agg(
+            pl.col("probes").sum(),
+            pl.col("successes").sum(),
+            pl.col("latency_sum").sum(),
+            pl.col("latency_min").min(),
+            pl.col("latency_max").max(),
+        )
+        .join(_percentiles(rows), on=["bucket", "target"], how="left")
+        .with_columns(
+            pl.col("latency_p50_ms").clip(*observed),
+            pl.col("latency_p95_ms").clip(*observed),
+            pl.col("latency_p99_ms").clip(*observed),
+            uptime_pct=pl.col("successes") / pl.col("probes") * 100,
+            loss_pct=100 - pl.col("successes") / pl.col("probes") * 100,
+            latency_avg_ms=pl.when(pl.col("successes") > 0).then(
+                pl.col("latency_sum") / pl.col("successes")
+            ),
+        )
+        .select(
+            "bucket",
+            "target",
+            "probes",
+            "uptime_pct",
+            "loss_pct",
+            "latency_avg_ms",
+            "latency_p50_ms",
+            "latency_p95_ms",
+            "latency_p99_ms",
+        )
+        .sort("bucket", "target")
+    )
+    if cached:
+        with _summary_lock:
+            _summary_cache[key] = (seq, time.monotonic(), df)
+            _summary_cache.move_to_end(key)
+            while len(_summary_cache) > SUMMARY_CACHE_SIZE:
+                _summary_cache.popitem(last=False)
+    return df
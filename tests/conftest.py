@@ -0,0 +1,10 @@
+import pytest
+from networkstats import storage
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Point storage at a fresh database for the test and close it afterwards."""
+    storage.open_db(tmp_path / "test.db")
+    yield
+    storage.close_db()
@@ -0,0 +1,136 @@
+import pytest
+from networkstats import alerts
+
+
+class CaptureNotifier(alerts.Notifier):
+    def __init__(self):
+        self.sent = []
+
+    def send(self, alert):
+        self.sent.append(alert)
+
+
+def test_loss_rule_fires_once_window_is_full():
+    engine = alerts.AlertEngine([alerts.LossRule(window=4, threshold=0.5)])
+    changes = []
+    for ok in [True, True, False, False]:
+        changes += engine.observe("a", 10.0 if ok else None, ok, ts=0)
+    assert [c.firing for c in changes] == [True]
+    assert changes[0].value == 0.5
+
+
+def test_loss_rule_hysteresis_holds_between_thresholds():
+    rule = alerts.LossRule(window=4, threshold=0.75, clear_threshold=0.25)
+    engine = alerts.AlertEngine([rule])
+    for ok in [False, False, False, True]:
+        engine.observe("a", None, ok, ts=0)
+    assert engine.firing() == [("loss", "a")]
+    # two failures in window -> 0.5, below fire threshold but above clear
+    engine.observe("a", 10.0, True, ts=0)
+    assert engine.firing() == [("loss", "a")]
+    engine.observe("a", 10.0, True, ts=0)
+    assert engine.firing() == [("loss", "a")]
+    engine.observe("a", 10.0, True, ts=0)
+    assert engine.firing() == []
+
+
+def test_fire_after_suppresses_flapping():
+    rule = alerts.LossRule(window=1, threshold=1, fire_after=3)
+    engine = alerts.AlertEngine([rule])
+    for ok in [False, True, False, False, True, False]:
+        assert engine.observe("a", None, ok, ts=0) == []
+    changes = []
+    for _ in range(3):
+        changes += engine.observe("a", None, False, ts=0)
+    assert [c.firing for c in changes] == [True]
+
+
+def test_down_rule_measures_outage_duration():
+    engine = alerts.AlertEngine([alerts.DownRule(threshold=60)])
+    assert engine.observe("a", None, False, ts=100) == []
+    assert engine.observe("a", None, False, ts=150) == []
+    (alert,) = engine.observe("a", None, False, ts=160)
+    assert alert.firing and alert.value == 60
+    (alert,) = engine.observe("a", 5.0, True, ts=170)
+    assert not alert.firing
+
+
+def test_latency_rule_percentile():
+    rule = alerts.LatencyRule(window=10, percentile=90, threshold=100)
+    engine = alerts.AlertEngine([rule])
+    for _ in range(9):
+        assert engine.observe("a", 20.0, True, ts=0) == []
+    # failures do not enter the latency window
+    assert engine.observe("a", None, False, ts=0) == []
+    assert engine.observe("a", 500.0, True, ts=0) == []  # p90 is still ~20 ms
+    (alert,) = engine.observe("a", 500.0, True, ts=0)
+    assert alert.firing
+    assert 500.0 <= alert.value <= 550.0
+
+
+def test_latency_rule_ignores_failures_for_debounce():
+    rule = alerts.LatencyRule(window=1, threshold=100, fire_after=2)
+    engine = alerts.AlertEngine([rule])
+    assert engine.observe("a", 500.0, True, ts=0) == []
+    for _ in range(3):
+        assert engine.observe("a", None, False, ts=0) == []
+    assert len(engine.observe("a", 500.0, True, ts=0)) == 1
+
+
+def test_rule_targets_filter():
+    engine = alerts.AlertEngine([alerts.LossRule(window=1, threshold=1, targets=["b"])])
+    assert engine.observe("a", None, False, ts=0) == []
+    assert len(engine.observe("b", None, False, ts=0)) == 1
+
+
+def test_queued_notifier_delivers_off_thread_and_rate_limits():
+    capture = CaptureNotifier()
+    notifier = alerts.QueuedNotifier(capture, rate_per_min=0, burst=2)
+    alert = alerts.Alert("down", "a", True, 1.0, 0)
+    assert notifier.submit(alert)
+    assert notifier.submit(alert)
+    assert not notifier.submit(alert)
+    notifier.close()
+    assert len(capture.sent) == 2
+    assert notifier.dropped == 1
+
+
+def test_queued_notifier_never_rate_limits_resolves():
+    capture = CaptureNotifier()
+    notifier = alerts.QueuedNotifier(capture, rate_per_min=0, burst=1)
+    assert notifier.submit(alerts.Alert("down", "a", True, 1.0, 0))
+    assert not notifier.submit(alerts.Alert("down", "b", True, 1.0, 0))
+    assert notifier.submit(alerts.Alert("down", "a", False, 0.0, 1))
+    notifier.close()
+    assert [a.firing for a in capture.sent] == [True, False]
+
+
+def test_queued_notifier_refunds_token_when_queue_is_full():
+    notifier = alerts.QueuedNotifier(CaptureNotifier(), queue_size=1, rate_per_min=0, burst=2)
+    notifier._queue.put_nowait(alerts.Alert("down", "x", True, 1.0, 0))  # worker not started
+    assert not notifier.submit(alerts.Alert("down", "a", True, 1.0, 0))
+    assert notifier._tokens == 2.0
+
+
+def test_from_config():
+    assert alerts.from_config({}) is None
+    engine = alerts.from_config(
+        {
+            "alerts": {
+                "rules": [{"type": "loss", "window": 5, "threshold": 0.4}],
+                "notifiers": [{"type": "log", "rate_per_min": 5}],
+            }
+        }
+    )
+    assert isinstance(engine.rules[0], alerts.LossRule)
+    assert isinstance(engine.notifiers[0].notifier, alerts.LogNotifier)
+    with pytest.raises(ValueError, match="Unknown option.*windw"):
+        alerts.from_config({"alerts": {"rules": [{"type": "loss", "threshold": 0.5, "windw": 5}]}})
+    with pytest.raises(ValueError, match="Unknown option.*uri"):
+        alerts.from_config(
+            {"alerts": {"rules": [{"type": "down", "threshold": 1}], "notifiers": [{"type": "webhook", "uri": "x"}]}}
+        )
+    with pytest.raises(ValueError, match="has no threshold"):
+        alerts.from_config({"alerts": {"rules": [{"type": "down"}]}})
+    with pytest.raises(ValueError, match="Unknown alert rule type"):
+        alerts.from_config({"alerts": {"rules": [{"type": "nope"}]}})
@@ -0,0 +1,59 @@
+import pytest
+from networkstats import backends, storage
+from networkstats.backends import Sample
+
+SAMPLES = [
+    Sample(100, "a", 10.0, 1),
+    Sample(101, "b", 0.0, 0),
+    Sample(105, "a", 12.0, 1),
+]
+
+
+@pytest.fixture(params=["sqlite", "memory"])
+def backend(request, tmp_path):
+    if request.param == "sqlite":
+        backend = backends.SQLiteBackend(tmp_path / "backend.db")
+    else:
+        backend = backends.MemoryBackend()
+    yield backend
+    backend.close()
+
+
+def test_write_many_and_query_range(backend):
+    backend.write_many(SAMPLES)
+    df = backend.query_range(100, 105)
+    assert df.sort("ts")["target"].to_list() == ["a", "b"]
+    df = backend.query_range(0, 1000, targets=["a"])
+    assert df.sort("ts")["latency_ms"].to_list() == [10.0, 12.0]
+    assert df.columns == ["ts", "target", "latency_ms", "success", "datetime"]
+
+
+def test_memory_backend_keeps_out_of_order_writes_sorted():
+    backend = backends.MemoryBackend()
+    backend.write_many([SAMPLES[2], SAMPLES[0], SAMPLES[1]])
+    assert backend.query_range(0, 1000)["ts"].to_list() == [100, 101, 105]
+    assert len(backend) == 3
+
+
+def test_null_backend_counts_and_returns_nothing():
+    backend = backends.NullBackend()
+    backend.write_many(SAMPLES)
+    assert backend.written == 3
+    assert backend.query_range(0).is_empty()
+
+
+def test_from_config():
+    assert isinstance(backends.from_config({"storage_backend": "null"}), backends.NullBackend)
+    assert isinstance(backends.from_config({"storage_backend": "memory"}), backends.MemoryBackend)
+    with pytest.raises(ValueError, match="Unknown storage backend"):
+        backends.from_config({"storage_backend": "duckdb"})
+
+
+def test_sqlite_backend_runs_retention_and_closes_shared_db(tmp_path):
+    backend = backends.SQLiteBackend(tmp_path / "backend.db")
+    (task,) = backend.background_tasks()
+    task.close()  # coroutine only; never scheduled here
+    backend.close()
+    assert storage.CONN is None
+    assert backends.MemoryBackend().background_tasks() == []
+    assert backends.NullBackend().background_tasks() == []
@@ -0,0 +1,64 @@
+import threading
+from networkstats import live
+
+
+def test_poll_coalesces_to_latest_sample():
+    channel = live.StatusChannel(history=3)
+    sub = channel.subscribe(max_hz=2.0)
+    for latency in (10.0, 20.0, 30.0, 40.0):
+        channel.publish("a", latency, True, ts=1)
+    channel.publish("b", None, False, ts=1)
+    changed = sub.poll(now=0.0)
+    assert set(changed) == {"a", "b"}
+    assert changed["a"].latency_ms == 40.0
+    assert changed["a"].history == (20.0, 30.0, 40.0)
+    assert not changed["b"].ok and changed["b"].history == (None,)
+    assert sub.poll(now=1.0) == {}  # nothing new
+
+
+def test_poll_is_rate_limited():
+    channel = live.StatusChannel()
+    sub = channel.subscribe(max_hz=2.0)
+    channel.publish("a", 1.0, True)
+    assert sub.poll(now=0.0)
+    channel.publish("a", 2.0, True)
+    assert sub.poll(now=0.1) == {}  # too soon, change stays pending
+    assert sub.poll(now=0.6)["a"].latency_ms == 2.0
+
+
+def test_subscribe_late_sees_known_targets_and_unsubscribe():
+    channel = live.StatusChannel()
+    channel.publish("a", 1.0, True)
+    sub = channel.subscribe()
+    assert set(sub.poll(now=0)) == {"a"}
+    sub.close()
+    channel.publish("a", 2.0, True)
+    assert sub.poll(now=10) == {}
+
+
+def test_publish_from_many_threads():
+    channel = live.StatusChannel()
+    sub = channel.subscribe(max_hz=0)
+
+    def worker(n):
+        for i in range(200):
+            channel.publish(f"t{n}-{i % 50}", float(i), True)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(sub.poll()) == 200
+    assert len(channel.latest()) == 200
+
+
+def test_sparkline_and_summary():
+    assert live.sparkline((1.0, None, 8.0)) == "▁✕█"
+    assert live.sparkline((None, None)) == "✕✕"
+    up = live.TargetStatus("a", 12.4, True, 0, (12.4,))
+    down = live.TargetStatus("b", None, False, 0, (None,))
+    assert live.summarize({}) == "Net📶"
+    assert live.summarize({"a": up}) == "🟢 12 ms"
+    assert live.summarize({"a": up, "b": down}) == "🔴 1/2 down"
+    assert live.format_item(down) == "b  down  ✕"
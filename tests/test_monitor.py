@@ -38,26 +38,58 @@ async def test_ping_once_timeout(monkeypatch):
 
 
 def test_monitor_once(monkeypatch):
-    # Patch _ping_once and record to avoid real pings and DB writes
+    # Patch _ping_once and use the null backend to avoid real pings and DB writes
     async def fake_ping_once(*args, **kwargs):
         return 42.0
     monkeypatch.setattr(monitor, "_ping_once", fake_ping_once)
-    monkeypatch.setattr(monitor, "record", lambda *a, **k: None)
     # Patch config to use a single target and short interval
-    monkeypatch.setattr(monitor, "cfg", {"targets": ["1.2.3.4"], "interval_sec": 0.01, "sqlite_path": ":memory:"})
+    monkeypatch.setattr(monitor, "cfg", {"targets": ["1.2.3.4"], "interval_sec": 0.01, "sqlite_path": ":memory:", "storage_backend": "null"})
     # Should complete after one iteration
     asyncio.run(monitor.monitor(once=True))
 
 
 def test_monitor_long_running(monkeypatch):
-    # Patch _ping_once and record to avoid real pings and DB writes
+    # Patch _ping_once and use the null backend to avoid real pings and DB writes
     async def fake_ping_once(*args, **kwargs):
         await asyncio.sleep(0.01)
         return 42.0
     monkeypatch.setattr(monitor, "_ping_once", fake_ping_once)
-    monkeypatch.setattr(monitor, "record", lambda *a, **k: None)
     # Patch config to use a single target and short interval
-    monkeypatch.setattr(monitor, "cfg", {"targets": ["1.2.3.4"], "interval_sec": 0.01, "sqlite_path": ":memory:"})
+    monkeypatch.setattr(monitor, "cfg", {"targets": ["1.2.3.4"], "interval_sec": 0.01, "sqlite_path": ":memory:", "storage_backend": "null"})
     # Should run for a short time and then be cancelled
     with pytest.raises(asyncio.TimeoutError):
         asyncio.run(asyncio.wait_for(monitor.monitor(), timeout=0.05))
+
+
+def test_monitor_writes_batch_to_backend(monkeypatch):
+    from networkstats.backends import MemoryBackend
+    async def fake_ping_once(target, **kwargs):
+        return None if target == "down" else 42.0
+    monkeypatch.setattr(monitor, "_ping_once", fake_ping_once)
+    monkeypatch.setattr(monitor, "cfg", {"targets": ["up", "down"], "interval_sec": 0.01})
+    backend = MemoryBackend()
+    asyncio.run(monitor.monitor(once=True, backend=backend))
+    df = backend.query_range(0).sort("target")
+    assert df["target"].to_list() == ["down", "up"]
+    assert df["success"].to_list() == [0, 1]
+
+
+def test_monitor_bad_alerts_config_opens_no_backend(monkeypatch):
+    opened = []
+    monkeypatch.setattr(monitor.backends, "from_config", lambda cfg: opened.append(cfg))
+    monkeypatch.setattr(monitor, "cfg", {"targets": ["a"], "interval_sec": 0.01, "alerts": {"rules": [{"type": "nope"}]}})
+    with pytest.raises(ValueError):
+        asyncio.run(monitor.monitor(once=True))
+    assert opened == []
+
+
+def test_monitor_leaves_a_passed_in_backend_open(monkeypatch):
+    from networkstats.backends import MemoryBackend
+    async def fake_ping_once(*args, **kwargs):
+        return 42.0
+    monkeypatch.setattr(monitor, "_ping_once", fake_ping_once)
+    monkeypatch.setattr(monitor, "cfg", {"targets": ["a"], "interval_sec": 0.01})
+    backend = MemoryBackend()
+    monkeypatch.setattr(backend, "close", lambda: pytest.fail("caller's backend was closed"))
+    asyncio.run(monitor.monitor(once=True, backend=backend))
+    assert len(backend) == 1
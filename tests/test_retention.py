@@ -0,0 +1,108 @@
+import asyncio
+import threading
+import time
+import pytest
+from networkstats import storage
+from networkstats import retention
+
+NOW = 100 * retention.DAY
+
+
+def _insert(rows):
+    with storage.writer() as c:
+        c.executemany(storage.INSERT_PING, rows)
+
+
+def _count(table):
+    with storage.reader() as c:
+        return c.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+@pytest.mark.usefixtures("db")
+def test_new_database_uses_incremental_vacuum():
+    with storage.reader() as c:
+        assert c.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+
+
+@pytest.mark.usefixtures("db")
+def test_compact_rolls_up_then_expires_raw():
+    old = NOW - 10 * retention.DAY
+    _insert([(old + i, "a", 10.0 + i, 1) for i in range(30)] + [(old + 30, "a", 0.0, 0)])
+    _insert([(NOW - 60, "a", 5.0, 1)])
+    report = retention.compact(retention.RetentionPolicy(), now=NOW)
+    assert report.complete
+    assert report.deleted["pings"] == 31
+    assert _count("pings") == 1  # within raw retention
+    with storage.reader() as c:
+        row = c.execute(
+            "SELECT probes, successes, latency_min, latency_max FROM pings_1m WHERE ts=?",
+            (old,),
+        ).fetchone()
+        assert row == (31, 30, 10.0, 39.0)
+        hour = c.execute("SELECT probes FROM pings_1h WHERE ts=?", (old - old % 3600,)).fetchone()
+        assert hour == (31,)
+
+
+@pytest.mark.usefixtures("db")
+def test_compact_leaves_a_grace_period_for_late_rows():
+    policy = retention.RetentionPolicy(rollup_grace_sec=120)
+    _insert([(NOW - 600, "a", 1.0, 1)])
+    retention.compact(policy, now=NOW)
+    _insert([(NOW - 5, "a", 1.0, 1)])  # stamped before the pass, committed after
+    retention.compact(policy, now=NOW + 300)
+    with storage.reader() as c:
+        assert c.execute("SELECT SUM(probes) FROM pings_1m").fetchone() == (2,)
+
+
+def test_policy_grace_covers_the_probe_interval():
+    assert retention.RetentionPolicy.from_config({"interval_sec": 300}).rollup_grace_sec == 600
+    assert retention.RetentionPolicy.from_config({}).rollup_grace_sec == 120
+
+
+@pytest.mark.usefixtures("db")
+def test_compact_never_expires_unrolled_rows():
+    old = NOW - 10 * retention.DAY
+    _insert([(old, "a", 1.0, 1)])
+    with storage.writer() as c:
+        c.execute(retention.SET_WATERMARK, ("1m", old))
+    # rollup budget exhausted immediately: the raw row must survive
+    report = retention.compact(retention.RetentionPolicy(max_seconds=-1), now=NOW)
+    assert not report.complete
+    assert _count("pings") == 1
+
+
+@pytest.mark.usefixtures("db")
+def test_compact_deletes_in_chunks_and_reclaims_space():
+    old = NOW - 200 * retention.DAY
+    _insert([(old + i, f"target-{i % 50}", 1.0, 1) for i in range(20000)])
+    retention.compact(retention.RetentionPolicy(raw_days=1000), now=NOW)
+    report = retention.compact(
+        retention.RetentionPolicy(raw_days=1, minute_days=1, chunk_rows=1000), now=NOW
+    )
+    assert report.deleted["pings"] == 20000
+    assert _count("pings_1m") == 0
+    assert _count("pings_1h") > 0  # hourly is kept forever
+    assert report.bytes_reclaimed > 0
+
+
+@pytest.mark.usefixtures("db")
+def test_cancel_waits_for_a_running_compaction(monkeypatch):
+    started, finished = threading.Event(), []
+
+    def slow_compact(policy):
+        started.set()
+        time.sleep(0.1)
+        finished.append(True)
+
+    monkeypatch.setattr(retention, "compact", slow_compact)
+
+    async def run():
+        task = asyncio.create_task(retention.run_periodically(retention.RetentionPolicy(interval_sec=0)))
+        while not started.is_set():
+            await asyncio.sleep(0.005)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert finished == [True]
+
+    asyncio.run(run())
@@ -1,4 +1,6 @@
 import pytest
+import sqlite3
+import threading
 import polars as pl
 from networkstats import storage
 from networkstats import config as config_mod
@@ -6,11 +8,9 @@ import pathlib
 
 
 def test_record_and_fetch_dataframe(tmp_path, monkeypatch):
-    # Patch DB path to temp
+    # Point writer and read pool at a temp DB
     db_path = tmp_path / "test.db"
-    monkeypatch.setattr(storage, "DB", db_path)
-    # Re-init connection
-    storage.CONN = storage._conn()
+    storage.open_db(db_path)
     # Record a ping
     storage.record("8.8.8.8", 42.0, True)
     df = storage.fetch_dataframe(60)
@@ -19,3 +19,67 @@ def test_record_and_fetch_dataframe(tmp_path, monkeypatch):
     assert df["target"].to_list() == ["8.8.8.8"]
     assert df["latency_ms"].to_list() == [42.0]
     assert df["success"].to_list() == [1]
+
+
+def test_fetch_dataframe_empty(tmp_path):
+    storage.open_db(tmp_path / "empty.db")
+    df = storage.fetch_dataframe(60)
+    assert df.is_empty()
+    assert df.columns == ["ts", "target", "latency_ms", "success", "datetime"]
+
+
+def test_read_pool_is_read_only(tmp_path):
+    storage.open_db(tmp_path / "ro.db")
+    with storage.reader() as c:
+        with pytest.raises(sqlite3.OperationalError):
+            c.execute(storage.INSERT_PING, (0, "x", 1.0, 1))
+
+
+def test_read_pool_is_bounded(tmp_path):
+    storage.open_db(tmp_path / "pool.db")
+    pool = storage.ReadPool(storage.DB, size=1)
+    got = []
+    with pool.connection() as first:
+        t = threading.Thread(target=lambda: got.append(pool._acquire()))
+        t.start()
+        t.join(0.05)
+        assert t.is_alive()  # waits for the only connection
+    t.join(1)
+    assert got == [first]
+    pool.close()
+
+
+def test_read_pool_closes_connections_returned_after_close(tmp_path):
+    storage.open_db(tmp_path / "pool.db")
+    pool = storage.ReadPool(storage.DB, size=2)
+    with pool.connection() as borrowed:
+        pool.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        borrowed.execute("SELECT 1")
+    with pytest.raises(sqlite3.ProgrammingError, match="closed"):
+        with pool.connection():
+            pass
+
+
+def test_readers_survive_close_db(tmp_path):
+    storage.open_db(tmp_path / "race.db")
+    errors = []
+
+    def read():
+        for _ in range(200):
+            try:
+                with storage.reader() as c:
+                    c.execute("SELECT COUNT(*) FROM pings").fetchone()
+            except Exception as e:  # any failure is a race
+                errors.append(e)
+
+    threads = [threading.Thread(target=read) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for _ in range(20):
+        storage.close_db()
+        storage.open_db(tmp_path / "race.db")
+    for t in threads:
+        t.join()
+    storage.close_db()
+    assert errors == []
@@ -0,0 +1,112 @@
+import sqlite3
+import pytest
+from networkstats import storage
+from networkstats import retention
+
+NOW = 100 * retention.DAY
+
+
+@pytest.mark.usefixtures("db")
+def test_summary_from_raw():
+    storage.record_many(
+        [(NOW - 100, "a", 10.0, 1), (NOW - 90, "a", 30.0, 1), (NOW - 80, "a", 0.0, 0), (NOW - 70, "b", 5.0, 1)]
+    )
+    df = storage.summary(window=3600, now=NOW)
+    a = df.filter(target="a").row(0, named=True)
+    assert a["probes"] == 3
+    assert a["uptime_pct"] == pytest.approx(200 / 3)
+    assert a["loss_pct"] == pytest.approx(100 / 3)
+    assert a["latency_avg_ms"] == 20.0
+    assert df["target"].to_list() == ["a", "b"]
+    assert storage.summary(["b"], window=3600, now=NOW)["target"].to_list() == ["b"]
+
+
+@pytest.mark.usefixtures("db")
+def test_summary_combines_rollups_and_tail_without_double_counting():
+    old = NOW - 2 * retention.DAY
+    storage.record_many([(old + i * 60, "a", 20.0, 1) for i in range(10)])
+    retention.compact(retention.RetentionPolicy(raw_days=1), now=NOW - 3600)
+    storage.record_many([(NOW - 60, "a", 40.0, 0)])
+    df = storage.summary(window=3 * retention.DAY, now=NOW)
+    (row,) = df.rows(named=True)
+    assert row["probes"] == 11
+    assert row["uptime_pct"] == pytest.approx(1000 / 11)
+    assert row["latency_p50_ms"] == 20.0
+
+
+@pytest.mark.usefixtures("db")
+def test_summary_hands_over_from_hourly_to_minute_rollups_on_the_hour():
+    base = NOW - 10 * 3600 + 1800  # first probe mid-hour
+    storage.record_many([(base + i * 30, "a", 10.0, 1) for i in range(240)])
+    retention.compact(retention.RetentionPolicy(), now=base + 3 * 3600)
+    assert storage.summary(window=4 * 3600, now=base + 3 * 3600)["probes"].to_list() == [240]
+    # expiring 1m rows mid-hour must not double count either
+    retention.compact(retention.RetentionPolicy(minute_days=1.25 / 24), now=base + 3 * 3600)
+    with storage.reader() as c:
+        assert c.execute("SELECT MIN(ts) FROM pings_1m").fetchone()[0] % 3600 != 0
+    assert storage.summary(window=4 * 3600, now=base + 3 * 3600)["probes"].to_list() == [240]
+
+
+@pytest.mark.usefixtures("db")
+def test_summary_buckets():
+    storage.record_many([(NOW - 3500, "a", 1.0, 1), (NOW - 100, "a", 1.0, 0)])
+    df = storage.summary(window=3600, buckets=2, now=NOW)
+    assert df["bucket"].to_list() == [NOW - 3600, NOW - 1800]
+    assert df["uptime_pct"].to_list() == [100.0, 0.0]
+
+
+@pytest.mark.usefixtures("db")
+def test_summary_cache_is_invalidated_by_writes(monkeypatch):
+    storage.record_many([(int(storage.time.time()) - 10, "a", 1.0, 1)])
+    calls = []
+    rows = storage._summary_rows
+    monkeypatch.setattr(storage, "_summary_rows", lambda *a: calls.append(a) or rows(*a))
+    first = storage.summary(window=60)
+    assert storage.summary(window=60) is first
+    assert len(calls) == 1
+    storage.record("a", 2.0, True)
+    assert storage.summary(window=60)["probes"].to_list() == [2]
+    assert len(calls) == 2
+
+
+@pytest.mark.usefixtures("db")
+def test_summary_percentiles_survive_rollups():
+    # every minute averages 505 ms, but half the probes took 1000 ms
+    old = NOW - 2 * retention.DAY
+    storage.record_many([(old + i * 30, "a", 10.0 if i % 2 else 1000.0, 1) for i in range(240)])
+    retention.compact(retention.RetentionPolicy(raw_days=1), now=NOW)
+    with storage.reader() as c:
+        assert c.execute("SELECT COUNT(*) FROM pings").fetchone()[0] == 0
+    (row,) = storage.summary(window=3 * retention.DAY, now=NOW).rows(named=True)
+    assert row["latency_p50_ms"] == pytest.approx(10.0, rel=0.1)
+    assert row["latency_p95_ms"] == 1000.0
+    assert row["latency_avg_ms"] == 505.0
+    # and once only the hourly rollup is left
+    retention.compact(retention.RetentionPolicy(raw_days=1, minute_days=1), now=NOW)
+    with storage.reader() as c:
+        assert c.execute("SELECT COUNT(*) FROM pings_1m").fetchone()[0] == 0
+    (row,) = storage.summary(window=3 * retention.DAY, now=NOW).rows(named=True)
+    assert row["latency_p95_ms"] == 1000.0
+    assert row["probes"] == 240
+
+
+def test_summary_weights_rollups_without_histograms_by_successes(tmp_path):
+    path = tmp_path / "legacy.db"
+    c = sqlite3.connect(path)
+    c.executescript(
+        """CREATE TABLE pings_1m (ts INTEGER NOT NULL, target TEXT NOT NULL, probes INTEGER NOT NULL,
+        successes INTEGER NOT NULL, latency_sum REAL, latency_min REAL, latency_max REAL,
+        PRIMARY KEY (ts, target));
+        CREATE TABLE rollup_state (resolution TEXT PRIMARY KEY, rolled_until INTEGER NOT NULL);"""
+    )
+    # one busy minute at 100 ms and one quiet minute at 10 ms
+    c.executemany(
+        "INSERT INTO pings_1m VALUES (?,?,?,?,?,?,?)",
+        [(NOW - 600, "a", 9, 9, 900.0, 100.0, 100.0), (NOW - 540, "a", 1, 1, 10.0, 10.0, 10.0)],
+    )
+    c.execute("INSERT INTO rollup_state VALUES ('1m', ?)", (NOW - 480,))
+    c.commit()
+    c.close()
+    storage.open_db(path)
+    (row,) = storage.summary(window=3600, now=NOW).rows(named=True)
+    assert row["latency_p50_ms"] == 100.0